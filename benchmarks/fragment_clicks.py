@@ -0,0 +1,152 @@
+"""每次點擊重跑了什麼、花多久：用 AppTest 照腳本點一輪 (裁判出題、選手同步 / 看答案 / 自己玩)
+
+在 repo 根目錄執行：python benchmarks/fragment_clicks.py [腳本] [重複次數]
+腳本預設是 web_game_4.py；要比較舊版就先 git show <commit>:web_game_4.py > old.py 再把 old.py 傳進來。
+
+- 點擊照瀏覽器的做法送出：按鈕在 st.fragment 裡就只重跑那個 fragment (AppTest 自己一律整頁重跑)
+- 函式次數用 cProfile 另跑一輪量；耗時不開 profiler，每輪都是新的行程，取中位數
+- 不連 PokeAPI；在暫存目錄跑，計分板的 scoreboard.db 不會留在 repo 裡
+- 真正的 server 會快取編譯好的 bytecode，AppTest 每次都重編譯 (約 45 ms)，這裡共用一份不算進點擊
+- st.image 第一次用才 import numpy (約 70 ms，一個行程只付一次)，這裡先 import 掉
+"""
+import cProfile
+import json
+import os
+import pstats
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = ("json_data", "all_moves_cache_3.json", "all_moves_cache_4.json")
+
+# (標籤, 按鈕 key) -> 按鈕所在的 fragment
+OWNER = {
+    ("🔄 下一題", None): "move_panel", ("🎲 下一題 (自己玩)", None): "move_panel", ("📥 同步題目", None): "move_panel",
+    ("👁️ 看答案", None): "move_reveal_panel",
+    ("🔄 下一題", "stat_next"): "stat_panel", ("🎲 下一題 (自己玩)", "stat_next_self"): "stat_panel",
+    ("📥 同步題目", "stat_sync"): "stat_panel", ("👁️ 看答案 ", "stat_ans"): "stat_reveal_panel",
+}
+# 整頁 (<module>) 與各畫面區塊、看答案的計算、出題
+WATCH = ("<module>", "leaderboard_panel", "move_panel", "move_reveal_panel", "stat_panel", "stat_reveal_panel",
+         "find_other_matches", "host_next_question", "sync_question", "self_play_question")
+
+HOST_STEPS = [
+    ("host: enter password", "text", "password", "bobohost"),
+    ("host: 下一題 (move)", "button", "🔄 下一題", None),
+    ("host: 下一題 (stat)", "button", "🔄 下一題", "stat_next"),
+]
+PLAYER_STEPS = [
+    ("player: 同步題目 (move)", "button", "📥 同步題目", None),
+    ("player: 看答案 (move)", "button", "👁️ 看答案", None),
+    ("player: 同步題目 (stat)", "button", "📥 同步題目", "stat_sync"),        # 配招題的答案還開著
+    ("player: 看答案 (stat)", "button", "👁️ 看答案 ", "stat_ans"),
+    ("player: 下一題 自己玩 (move)", "button", "🎲 下一題 (自己玩)", None),
+    ("player: 看答案 (move, 新題目)", "button", "👁️ 看答案", None),
+    ("player: 下一題 自己玩 (stat)", "button", "🎲 下一題 (自己玩)", "stat_next_self"),
+]
+
+def run_once(script, profile):
+    """在這個行程裡點一輪，每一步印一行 JSON"""
+    import numpy  # noqa: F401
+    import requests
+    import streamlit.testing.v1.local_script_runner as lsr
+    from streamlit.runtime.scriptrunner import RerunData
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest
+
+    class FakeResponse:
+        status_code = 200
+        def json(self): return {"id": 25, "names": [{"language": {"name": "en"}, "name": "Pikachu"}]}
+    requests.get = lambda *a, **k: FakeResponse()
+
+    state = {"fragment": None, "profiler": None, "seconds": 0.0}
+    shared_cache = ScriptCache()
+    lsr.ScriptCache = lambda: shared_cache
+    lsr.RerunData = lambda **kw: RerunData(**kw, **(
+        {"fragment_id_queue": [state["fragment"]], "is_fragment_scoped_rerun": True} if state["fragment"] else {}))
+    real_thread = lsr.LocalScriptRunner._run_script_thread
+    def timed_thread(self):
+        t0 = time.perf_counter()
+        if state["profiler"]: state["profiler"].enable()
+        try: real_thread(self)
+        finally:
+            if state["profiler"]: state["profiler"].disable()
+            state["seconds"] = time.perf_counter() - t0
+    lsr.LocalScriptRunner._run_script_thread = timed_thread
+
+    def fragment_ids(at):
+        ids = {}
+        for fragment_id, wrapped in at._fragment_storage._fragments.items():
+            for cell in wrapped.__closure__ or ():
+                try: name = getattr(cell.cell_contents, "__name__", None)
+                except ValueError: continue
+                if name and name.endswith("_panel"): ids[name] = fragment_id
+        return ids
+
+    def session():
+        state["fragment"] = None
+        at = AppTest.from_file(script, default_timeout=60)
+        at.run()
+        state["tree"] = at._tree
+        return at
+
+    def step(at, label, kind, widget, value):
+        # 只重跑 fragment 的那次，AppTest 只拿到那一塊的元件：用上一次整頁的元件樹找按鈕
+        at._tree = state["tree"]
+        for button in at.button: button._value = False
+        state["fragment"] = None
+        if kind == "text":
+            next(t for t in at.text_input if t.label == widget).input(value)
+        else:
+            next(b for b in at.button if b.label == widget and (value is None or b.key == value)).click()
+            state["fragment"] = fragment_ids(at).get(OWNER[(widget, value)])    # 舊版沒有 fragment：整頁重跑
+        state["profiler"] = cProfile.Profile() if profile else None
+        at.run()
+        assert not at.exception, at.exception
+        if state["fragment"] is None: state["tree"] = at._tree
+        row = {"step": label, "ms": state["seconds"] * 1000}
+        if profile:
+            calls = {}
+            for (filename, _, name), (_, ncalls, *_) in pstats.Stats(state["profiler"]).stats.items():
+                if filename == script and name in WATCH: calls[name] = calls.get(name, 0) + ncalls
+            row["calls"] = calls
+        print(json.dumps(row, ensure_ascii=False), flush=True)
+
+    random.seed(0)
+    host = session()
+    for s in HOST_STEPS: step(host, *s)
+    player = session()
+    for s in PLAYER_STEPS: step(player, *s)
+
+def describe(calls):
+    """這次點擊重跑了什麼：整頁幾次，或是哪些 fragment"""
+    passes = calls.get("<module>", 0)
+    if passes: ran = f"{passes} full pass" + ("es" if passes > 1 else "")
+    else: ran = ", ".join(n for n in WATCH[1:6] if calls.get(n)) or "-"
+    matches = calls.get("find_other_matches", 0)
+    return ran + (f", {matches} match" if matches else "")
+
+def main(script="web_game_4.py", repeats=9):
+    script = os.path.abspath(script)
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in DATA: os.symlink(os.path.join(ROOT, name), os.path.join(workdir, name))
+        def collect(*flags):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--once", script, *flags],
+                                 cwd=workdir, capture_output=True, text=True, check=True).stdout
+            return [json.loads(line) for line in out.splitlines() if line.startswith("{")]
+        profiled = collect("--profile")
+        timed = [collect() for _ in range(repeats)]
+    print(f"{os.path.basename(script)}: median of {repeats} processes")
+    for i, row in enumerate(profiled):
+        ms = statistics.median(run[i]['ms'] for run in timed)
+        print(f"  {row['step']:<32}{describe(row['calls']):<44}{ms:7.1f} ms")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--once"]:
+        run_once(sys.argv[2], "--profile" in sys.argv[3:])
+    else:
+        main(*sys.argv[1:2], *(int(a) for a in sys.argv[2:3]))
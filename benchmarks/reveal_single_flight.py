@@ -0,0 +1,56 @@
+"""N 個連線同時對同一題按「看答案」：各自計算 vs. single-flight 共用一次的 CPU 與延遲
+
+在 repo 根目錄執行：python benchmarks/reveal_single_flight.py [連線數] [重複次數]
+用真的 all_moves_cache_3.json，不連網路。
+"""
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import web_game_4 as w
+
+def run(sessions, reveal):
+    """sessions 個執行緒在 barrier 後一起呼叫 reveal()；回傳 (CPU 秒數, 總耗時, 各連線從放行到拿到結果的延遲)"""
+    barrier = threading.Barrier(sessions + 1)
+    finished = []
+    def session():
+        barrier.wait()
+        reveal()
+        finished.append(time.perf_counter())
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for t in threads: t.start()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    barrier.wait()
+    for t in threads: t.join()
+    return time.process_time() - cpu0, time.perf_counter() - wall0, [t - wall0 for t in finished]
+
+def main(sessions=200, repeats=5):
+    vgc_db, move_cache = w.load_vgc_data(), w.load_move_cache()
+    name = next(n for n in vgc_db if w.find_cache_entry(move_cache, n))
+    q = {"answer_id": 1, "target_pm_name": name, "moves_raw": w.find_cache_entry(move_cache, name)['moves'][:4]}
+
+    def independent():
+        # 改之前：每個連線自己算 find_other_matches
+        return lambda: w.compute_reveal_data(dict(q), move_cache)
+    def single_flight():
+        # 現在：整個房間同一題只算一次 (每回合換新的 server，才不會直接吃到上一回合的結果)
+        w.server = w.GameServer()
+        return lambda: w.get_reveal_data(dict(q), move_cache)
+
+    print(f"{sessions} simultaneous reveals of {name}, median of {repeats} runs")
+    for label, make in (("independent", independent), ("single-flight", single_flight)):
+        runs = [run(sessions, make()) for _ in range(repeats)]
+        cpu = statistics.median(r[0] for r in runs)
+        wall = statistics.median(r[1] for r in runs)
+        p50 = statistics.median(statistics.median(r[2]) for r in runs)
+        worst = statistics.median(max(r[2]) for r in runs)
+        print(f"  {label:<14}cpu {cpu:.3f}s  wall {wall:.3f}s  latency p50 {p50 * 1000:.1f} ms  max {worst * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
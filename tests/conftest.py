@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+SCRIPT = os.path.join(ROOT, "web_game_4.py")
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    # 題庫路徑都是相對路徑，測試一律在 repo 根目錄跑
+    monkeypatch.chdir(ROOT)
+
+class FakeResponse:
+    """PokeAPI 的假回應：每個名稱都查得到"""
+    status_code = 200
+    def json(self):
+        return {"id": 25, "names": [{"language": {"name": "en"}, "name": "Pikachu"}]}
+
+@pytest.fixture
+def app_env(monkeypatch, tmp_path):
+    """用 AppTest 跑整個 app：乾淨的快取、不連 PokeAPI，在暫存目錄跑 (側邊欄排行榜會開 scoreboard.db，題庫用連結)"""
+    requests = pytest.importorskip("requests")
+    st = pytest.importorskip("streamlit")
+    pytest.importorskip("opencc")
+    import web_game_4 as w
+    for name in (w.JSON_FOLDER_PATH, w.CACHE_PATH_MOVES, w.CACHE_PATH_STATS):
+        os.symlink(os.path.join(ROOT, name), tmp_path / name)
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    monkeypatch.setattr(requests, "get", lambda *a, **k: FakeResponse())
+    return tmp_path
@@ -0,0 +1,74 @@
+import random
+from array import array
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+
+import web_game_4 as w
+
+DRAWS = 3000
+
+@pytest.fixture
+def pools():
+    return w.load_distractor_pools()
+
+def weights(cum):
+    """累積權重還原成每個招式自己的權重"""
+    return [cum[0]] + [cum[k] - cum[k - 1] for k in range(1, len(cum))]
+
+def test_pools_skip_banned_and_duplicate_moves(pools):
+    move_cache = w.load_move_cache()
+    raw = {w.normalize_name(m) for name in pools['pools'] for m in (w.find_cache_entry(move_cache, name) or {}).get('moves', [])}
+    assert w.BANNED_MOVES & raw             # 招式表裡本來就有禁招，不是空測
+    for idx, cum in pools['pools'].values():
+        assert len(set(idx)) == len(idx) == len(cum)
+        assert not {w.normalize_name(pools['vocab'][i]) for i in idx} & w.BANNED_MOVES
+
+def test_weights_follow_usage_and_type(pools):
+    vgc_db = w.load_vgc_data()
+    usage = {w.normalize_name(m) for pm in vgc_db.values() for m in pm['moves']}
+    name, (idx, cum) = next((n, p) for n, p in pools['pools'].items() if len(set(weights(p[1]))) == 3)
+    same_type = {w.normalize_name(m) for pm in vgc_db.values()
+                 if set(pm.get('types', [])) & set(vgc_db[name].get('types', [])) for m in pm['moves']}
+    for i, weight in zip(idx, weights(cum)):
+        move = w.normalize_name(pools['vocab'][i])
+        assert weight == (w.DISTRACTOR_WEIGHT_BASE + w.DISTRACTOR_WEIGHT_USAGE * (move in usage)
+                          + w.DISTRACTOR_WEIGHT_TYPE * (move in same_type))
+
+    # 抽很多次：有人用的招式比沒人用的常出現
+    rng = random.Random(0)
+    drawn = Counter(m for _ in range(DRAWS) for m in w.sample_distractors(name, [], count=1, rng=rng))
+    by_weight = {}
+    for i, weight in zip(idx, weights(cum)):
+        by_weight.setdefault(weight, []).append(drawn[pools['vocab'][i]])
+    mean = {weight: sum(n) / len(n) for weight, n in by_weight.items()}
+    assert mean[w.DISTRACTOR_WEIGHT_BASE] * 2 < min(v for k, v in mean.items() if k != w.DISTRACTOR_WEIGHT_BASE)
+
+def test_clue_moves_never_come_back(pools):
+    name, (idx, cum) = max(pools['pools'].items(), key=lambda item: len(item[1][0]))
+    # 把最重的招式當成線索，換大小寫與空白也認得
+    heaviest = sorted(zip(weights(cum), idx), reverse=True)[:3]
+    clues = [pools['vocab'][i].upper().replace("-", " ") for _, i in heaviest]
+    rng = random.Random(0)
+    for _ in range(DRAWS // 10):
+        picked = w.sample_distractors(name, clues, count=w.DISTRACTOR_NUM, rng=rng)
+        assert len(set(picked)) == len(picked) == w.DISTRACTOR_NUM
+        assert not {w.normalize_name(m) for m in picked} & {w.normalize_name(c) for c in clues}
+
+def test_species_without_pool_returns_nothing(pools):
+    empty = [name for name, (idx, _) in pools['pools'].items() if not idx]
+    assert empty                            # 有些 VGC 物種在招式表裡查不到
+    assert w.sample_distractors(empty[0], ["Fake Out"]) == []
+    assert w.sample_distractors("Missingno", []) == []
+
+def test_unknown_clue_moves_keep_the_weights(monkeypatch):
+    # 4 招抽 3 招、線索不在招式表裡：還是照權重抽，不會掉進「池子太小就全拿」的平均打亂
+    monkeypatch.setattr(w, "load_distractor_pools", lambda: {
+        "vocab": ["a", "b", "c", "d"], "index": {m: i for i, m in enumerate("abcd")},
+        "pools": {"Pikachu": (array('H', range(4)), array('d', [1000, 1001, 1002, 1003]))}})
+    rng = random.Random(0)
+    for _ in range(200):
+        assert "a" in w.sample_distractors("Pikachu", ["Not A Move"], count=3, rng=rng)
@@ -0,0 +1,117 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+
+from streamlit.testing.v1 import AppTest
+
+from conftest import SCRIPT
+
+@pytest.fixture
+def calls(app_env):
+    """記錄 web_game_4.py 裡每個函式被呼叫幾次 (<module> = 整頁跑了幾次)"""
+    counter = Counter()
+    def hook(frame, event, arg):
+        if event == "call" and frame.f_code.co_filename == SCRIPT: counter[frame.f_code.co_name] += 1
+    threading.setprofile(hook)          # AppTest 每次 run 都開新的執行緒跑腳本
+    yield counter
+    threading.setprofile(None)
+
+def player_session():
+    """選手的連線：等暖機出好第一題、兩個分頁都有「看答案」"""
+    at = AppTest.from_file(SCRIPT, default_timeout=30)
+    deadline = time.monotonic() + 30
+    while True:
+        at.run()
+        assert not at.exception
+        if len([b for b in at.button if b.label.startswith("👁️ 看答案")]) == 2: return at
+        assert time.monotonic() < deadline, "warm-up never published a question"
+        time.sleep(0.2)
+
+def click(at, label, key=None):
+    next(b for b in at.button if b.label == label and (key is None or b.key == key)).click()
+    at.run()
+    assert not at.exception
+
+def test_clicks_run_the_script_once_and_reveal_data_once(calls):
+    at = player_session()
+
+    calls.clear()
+    click(at, "👁️ 看答案")
+    assert calls["<module>"] == 1           # 按鈕在同一次執行處理，不再 st.rerun() 多跑一次
+    assert calls["find_other_matches"] == 1
+
+    calls.clear()
+    click(at, "📥 同步題目", key="stat_sync")
+    assert calls["<module>"] == 1           # 同步不再 sleep + st.rerun()
+    assert calls["find_other_matches"] == 0  # 看過的答案掛在題目上，之後的點擊不重算
+
+    calls.clear()
+    click(at, "🎲 下一題 (自己玩)")
+    click(at, "👁️ 看答案")
+    assert calls["find_other_matches"] == 1  # 新題目才重算
+
+@pytest.fixture
+def fragment_click(calls, monkeypatch):
+    """照瀏覽器的做法點按鈕：只重跑按鈕所在的 fragment (AppTest 自己一律整頁重跑)。
+    回傳這次點擊呼叫到的函式次數"""
+    import streamlit.testing.v1.local_script_runner as lsr
+    scope = {}
+    real = lsr.RerunData
+    def rerun_data(**kwargs):
+        if scope: kwargs.update(fragment_id_queue=[scope["id"]], is_fragment_scoped_rerun=True)
+        return real(**kwargs)
+    monkeypatch.setattr(lsr, "RerunData", rerun_data)
+
+    def fragment_ids(at):
+        # 被 @st.fragment 包起來的函式名稱 -> fragment id
+        ids = {}
+        for fragment_id, wrapped in at._fragment_storage._fragments.items():
+            for cell in wrapped.__closure__ or ():
+                try: name = getattr(cell.cell_contents, "__name__", None)
+                except ValueError: continue
+                if name and name.endswith("_panel"): ids[name] = fragment_id
+        return ids
+
+    def click_in(at, fragment, label, key=None):
+        ids = fragment_ids(at)
+        assert fragment in ids, f"{fragment} is not an st.fragment"
+        scope["id"] = ids[fragment]
+        calls.clear()
+        try: click(at, label, key)
+        finally: scope.clear()
+        ran = Counter(calls)
+        at.run()        # 只重跑 fragment 時 AppTest 只拿到那一塊的元件，整頁再畫一次，下一步才找得到按鈕
+        return ran
+    return click_in
+
+PANELS = ("main", "leaderboard_panel", "move_panel", "move_reveal_panel", "stat_panel", "stat_reveal_panel")
+
+def panels(ran):
+    """這次點擊重跑了哪些畫面區塊 (main = 整頁)"""
+    return {p for p in PANELS if ran[p]}
+
+def test_click_reruns_only_its_own_panel(fragment_click):
+    at = player_session()
+
+    # 看答案只重跑答案區：題目、按鈕列、另一個分頁、側邊欄都不動
+    ran = fragment_click(at, "move_reveal_panel", "👁️ 看答案")
+    assert panels(ran) == {"move_reveal_panel"}
+    assert ran["find_other_matches"] == 1 and ran["<module>"] == 0
+
+    ran = fragment_click(at, "stat_reveal_panel", "👁️ 看答案 ", key="stat_ans")
+    assert panels(ran) == {"stat_reveal_panel"}
+    assert ran["find_other_matches"] == 0
+
+    # 同步 / 下一題重跑該分頁 (連同裡面的答案區)，另一個分頁不動
+    ran = fragment_click(at, "stat_panel", "📥 同步題目", key="stat_sync")
+    assert panels(ran) == {"stat_panel", "stat_reveal_panel"}
+    assert ran["sync_question"] == 1 and ran["find_other_matches"] == 0
+
+    ran = fragment_click(at, "move_panel", "🎲 下一題 (自己玩)")
+    assert panels(ran) == {"move_panel", "move_reveal_panel"}
+    assert ran["self_play_question"] == 1
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+
+import web_game_4 as w
+from conftest import ROOT
+
+QUESTION = {"answer_name": "熾焰咆哮虎", "answer_jp": "ガオガエン", "answer_en": "Incineroar", "target_pm_name": "Incineroar"}
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    # 背景寫入這裡不要自己跑，flush 由測試決定什麼時候做
+    monkeypatch.setattr(w, "SCORE_FLUSH_INTERVAL", 3600)
+    return str(tmp_path / "scoreboard.db")
+
+def flush(board):
+    conn = sqlite3.connect(board.db_path)
+    try: board.flush(conn)
+    finally: conn.close()
+
+def test_points_decay_with_time_since_published(db_path):
+    board = w.Scoreboard(db_path)
+    round_id = board.open_round("move", QUESTION, time.time() - 10)
+    assert board.submit_guess(round_id, "ash", "  gaogaen  ") == (False, 0)
+    late = board.open_round("move", QUESTION, time.time() - 10)
+    late_points = w.SCORE_MAX_POINTS - 10 * w.SCORE_DECAY_PER_SEC
+    assert board.submit_guess(late, "misty", "ガオガエン") == (True, late_points)
+    _, elapsed, correct, points = board.rounds[late]['guesses']["misty"]
+    assert elapsed == pytest.approx(10, abs=0.5) and correct
+    very_late = board.open_round("move", QUESTION, time.time() - 3600)
+    assert board.submit_guess(very_late, "misty", "incineroar") == (True, w.SCORE_MIN_POINTS)
+    assert board.leaderboard() == [("misty", late_points + w.SCORE_MIN_POINTS, 2, 2), ("ash", 0, 0, 1)]
+
+def test_second_guess_and_guess_after_reveal_are_refused(db_path):
+    board = w.Scoreboard(db_path)
+    round_id = board.open_round("move", QUESTION, time.time())
+    assert board.submit_guess(round_id, "ash", "wrong") == (False, 0)
+    assert board.submit_guess(round_id, "ash", "Incineroar") is None
+    board.mark_revealed(round_id, "misty")
+    assert board.submit_guess(round_id, "misty", "Incineroar") is None
+    assert board.submit_guess(round_id, "brock", "Incineroar")[0]
+    assert board.submit_guess(round_id + 1, "brock", "Incineroar") is None     # 沒開過的回合
+
+def test_placeholder_names_are_not_answers(db_path):
+    board = w.Scoreboard(db_path)
+    # PokeAPI 查不到名稱時，題目上會留下 'N/A' / None
+    q = dict(QUESTION, answer_name="N/A", answer_jp=None)
+    round_id = board.open_round("move", q, time.time())
+    assert board.submit_guess(round_id, "ash", "N/A") == (False, 0)
+    assert board.submit_guess(round_id, "misty", "None") == (False, 0)
+    assert board.submit_guess(round_id, "brock", "") == (False, 0)
+    assert board.submit_guess(round_id, "gary", "incineroar")[0]
+
+def test_flushed_totals_and_round_ids_survive_restart(db_path):
+    board = w.Scoreboard(db_path)
+    first = board.open_round("move", QUESTION, time.time())
+    second = board.open_round("stat", QUESTION, time.time())
+    board.submit_guess(first, "ash", "Incineroar")
+    board.submit_guess(second, "ash", "wrong")
+    flush(board)
+    assert not board.pending_rounds and not board.pending_guesses
+
+    restarted = w.Scoreboard(db_path)
+    assert restarted.leaderboard() == board.leaderboard()
+    assert restarted.open_round("move", QUESTION, time.time()) == second + 1
+
+def test_failed_flush_requeues_the_batch(db_path):
+    board = w.Scoreboard(db_path)
+    round_id = board.open_round("move", QUESTION, time.time())
+    board.submit_guess(round_id, "ash", "Incineroar")
+    broken = sqlite3.connect(":memory:")       # 沒有建表，寫入一定失敗
+    with pytest.raises(sqlite3.Error):
+        board.flush(broken)
+    assert len(board.pending_rounds) == 1 and len(board.pending_guesses) == 1
+    # 失敗期間進來的作答排在後面，順序不亂
+    board.submit_guess(board.open_round("move", QUESTION, time.time()), "ash", "Incineroar")
+    assert [g[0] for g in board.pending_guesses] == [round_id, round_id + 1]
+    flush(board)
+    assert w.Scoreboard(db_path).leaderboard()[0][3] == 2
+
+EXIT_SCRIPT = r'''
+import sys, time
+import web_game_4 as w
+w.SCORE_FLUSH_INTERVAL = 3600
+board = w.Scoreboard(sys.argv[1])
+board.submit_guess(board.open_round("move", {"answer_en": "Incineroar"}, time.time()), "ash", "incineroar")
+'''
+
+def test_pending_answers_are_written_at_exit(db_path):
+    # 背景寫入還沒輪到就結束行程：靠 atexit 的最後一次寫入
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-c", EXIT_SCRIPT, db_path], cwd=ROOT, env=env, check=True,
+                   capture_output=True, timeout=120)
+    assert w.Scoreboard(db_path).leaderboard() == [("ash", w.SCORE_MAX_POINTS, 1, 1)]
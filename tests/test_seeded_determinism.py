@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+
+from conftest import ROOT
+
+# 子行程裡把 PokeAPI 換成固定的假資料：有 "-" 的物種當作 404 (逼出重抽)，其餘照名字給固定的 id 與名稱
+STREAM_SCRIPT = r'''
+import json, sys
+import web_game_4 as w
+
+misses = []
+def fake_fetch(endpoint, name):
+    if endpoint == "pokemon-species" and "-" in name:
+        misses.append(name)
+        return None
+    return {"id": sum(map(ord, name)), "names": {"en": name.title(), "ja": "ja:" + name, "zh-Hant": "zh:" + name}}
+w.fetch_pokeapi_names = fake_fetch
+
+vgc_db, move_cache, stat_cache = w.load_vgc_data(), w.load_move_cache(), w.load_stat_cache()
+stream = []
+for round_no in range(1, 21):
+    mq = w.generate_seeded_question("move", vgc_db, move_cache, 123456, round_no)
+    sq = w.generate_seeded_question("stat", vgc_db, stat_cache, 123456, round_no)
+    stream.append([mq["target_pm_name"], mq["moves_raw"], mq["answer_id"], sq["answer_en"], sq["stats"]])
+print(json.dumps({"version": w.load_snapshot_version(), "stream": stream, "misses": len(misses)}))
+'''
+
+def build_stream(hash_seed):
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed), PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", STREAM_SCRIPT], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=120, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def test_seeded_stream_is_identical_across_processes():
+    first, second = build_stream(1), build_stream(2)
+    assert first["version"] == second["version"]
+    assert first["stream"] == second["stream"]
+    # 假資料裡有 404 的物種，確認重抽路徑真的有被走到
+    assert first["misses"] > 0
+
+def test_transient_species_miss_does_not_change_the_question(monkeypatch):
+    import web_game_4 as w
+
+    def fake_fetch(endpoint, name):
+        return {"id": 1, "names": {"en": name.title()}}
+
+    vgc_db, move_cache = w.load_vgc_data(), w.load_move_cache()
+    monkeypatch.setattr(w, "fetch_pokeapi_names", fake_fetch)
+    clean = w.generate_seeded_question("move", vgc_db, move_cache, 123456, 1)
+
+    failed = []
+    def flaky_fetch(endpoint, name):
+        if endpoint == "pokemon-species" and not failed:
+            failed.append(name)
+            raise w.LookupFailed("timeout")
+        return fake_fetch(endpoint, name)
+
+    monkeypatch.setattr(w, "fetch_pokeapi_names", flaky_fetch)
+    flaky = w.generate_seeded_question("move", vgc_db, move_cache, 123456, 1)
+    assert failed
+    assert flaky["target_pm_name"] == clean["target_pm_name"]
+    assert flaky["moves_raw"] == clean["moves_raw"]
+    assert flaky["answer_id"] is None
+
+def test_turning_seed_mode_off_keeps_the_latest_question(monkeypatch, tmp_path):
+    import web_game_4 as w
+
+    monkeypatch.setattr(w, "fetch_pokeapi_names", lambda endpoint, name: {"id": 1, "names": {"en": name.title()}})
+    monkeypatch.setattr(w, "SCORE_FLUSH_INTERVAL", 3600)
+    monkeypatch.setattr(w, "server", w.GameServer())
+    w.server._scoreboard = w.Scoreboard(str(tmp_path / "scoreboard.db"))
+    vgc_db, move_cache = w.load_vgc_data(), w.load_move_cache()
+
+    old = w.host_next_question("move", vgc_db, move_cache)      # 例如暖機出的題目
+    w.server.seed, w.server.seed_round_move = 123456, 0           # 裁判打開種子模式
+    seeded = w.host_next_question("move", vgc_db, move_cache)
+    assert w.sync_question("move", vgc_db, move_cache)["round_id"] == seeded["round_id"]
+    w.server.seed = None                                          # 裁判關掉種子模式
+    synced = w.sync_question("move", vgc_db, move_cache)
+    assert synced is seeded
+    assert synced["round_id"] != old["round_id"]
@@ -0,0 +1,117 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+pytest.importorskip("requests")
+
+import requests
+import web_game_4 as w
+
+SESSIONS = 200
+
+def in_parallel(n, func):
+    """n 個執行緒一起放出去呼叫 func，回傳各自的結果"""
+    barrier = threading.Barrier(n)
+    def call():
+        barrier.wait()
+        return func()
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(lambda _: call(), range(n)))
+
+@pytest.fixture
+def question(monkeypatch):
+    monkeypatch.setattr(w, "server", w.GameServer())
+    move_cache = w.load_move_cache()
+    name = next(iter(w.load_vgc_data()))
+    q = {"answer_id": 727, "target_pm_name": name, "moves_raw": w.find_cache_entry(move_cache, name)['moves'][:4]}
+    return q, move_cache
+
+def test_simultaneous_reveals_compute_once(question, monkeypatch):
+    q, move_cache = question
+    calls = []
+    real = w.find_other_matches
+    def counted(*args):
+        calls.append(1)
+        time.sleep(0.05)        # 讓其他連線在計算途中抵達
+        return real(*args)
+    monkeypatch.setattr(w, "find_other_matches", counted)
+    # 每個連線拿到的是同一題的各自副本 (跟 sync 之後一樣)，只共用 question_id
+    results = in_parallel(SESSIONS, lambda: w.get_reveal_data(dict(q), move_cache))
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+def test_failed_computation_is_not_cached():
+    flight = w.SingleFlight()
+    attempts = []
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1: raise ValueError("boom")
+        return "ok"
+    with pytest.raises(ValueError):
+        flight.do("q", flaky)
+    assert flight.do("q", flaky) == "ok"
+    assert flight.do("q", flaky) == "ok"
+    assert len(attempts) == 2
+
+class Abort(BaseException):
+    """跟 st.rerun()/st.stop() 一樣不是 Exception 的子類別"""
+
+def test_base_exception_reaches_waiters():
+    flight = w.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    def owner_func():
+        started.set()
+        release.wait(5)
+        raise Abort()
+    errors = []
+    def call():
+        try: flight.do("q", owner_func)
+        except Abort as e: errors.append(e)
+    owner = threading.Thread(target=call, daemon=True)
+    owner.start()
+    started.wait(5)
+    waiter = threading.Thread(target=call, daemon=True)
+    waiter.start()
+    time.sleep(0.05)            # 等待的人已經在 result() 上等
+    release.set()
+    owner.join(5)
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert len(errors) == 2
+    assert "q" not in flight.futures
+
+def test_simultaneous_lookups_send_one_request(monkeypatch):
+    monkeypatch.setattr(w, "server", w.GameServer())
+    sent = []
+    class Response:
+        status_code = 200
+        def json(self): return {"id": 6, "names": [{"language": {"name": "ja"}, "name": "ねこだまし"}]}
+    def get(url, timeout):
+        sent.append(url)
+        time.sleep(0.05)
+        return Response()
+    monkeypatch.setattr(requests, "get", get)
+    results = in_parallel(SESSIONS, lambda: w.get_move_info("Fake Out"))
+    assert len(sent) == 1
+    assert set(results) == {("Fake Out", "ねこだまし", "Fake Out")}
+
+def test_failed_lookup_is_retried(monkeypatch):
+    monkeypatch.setattr(w, "server", w.GameServer())
+    sent = []
+    def get(url, timeout):
+        sent.append(url)
+        if len(sent) == 1: raise requests.ConnectionError("down")
+        class Response:
+            status_code = 200
+            def json(self): return {"id": 727, "names": [{"language": {"name": "en"}, "name": "Incineroar"}]}
+        return Response()
+    monkeypatch.setattr(requests, "get", get)
+    with pytest.raises(w.LookupFailed):
+        w.get_pokemon_id("incineroar")
+    assert w.get_pokemon_id("incineroar") == 727
+    assert w.get_pokemon_id("incineroar") == 727
+    assert len(sent) == 2
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+pytest.importorskip("requests")
+
+import web_game_4 as w
+
+DELAYS = {}         # 路徑最後一段 -> 延遲秒數
+MISSING = set()     # 回 404 的名稱
+BROKEN = set()      # 回 500 的名稱
+REQUESTS = []       # 收到的請求路徑
+DEFAULT_DELAY = 0.3
+
+class FakePokeAPI(BaseHTTPRequestHandler):
+    def do_GET(self):
+        name = self.path.rstrip("/").rsplit("/", 1)[-1]
+        REQUESTS.append(name)
+        time.sleep(DELAYS.get(name, DEFAULT_DELAY))
+        if name in MISSING or name in BROKEN:
+            self.send_response(404 if name in MISSING else 500)
+            self.end_headers()
+            return
+        body = json.dumps({"id": len(name), "names": [
+            {"language": {"name": "en"}, "name": name.title()},
+            {"language": {"name": "ja"}, "name": "ja-" + name},
+            {"language": {"name": "zh-Hant"}, "name": "zh-" + name},
+        ]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        try: self.wfile.write(body)
+        except OSError: pass    # 用戶端已經逾時斷線
+
+    def log_message(self, *args): pass
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakePokeAPI)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(w, "POKEAPI_URL", f"http://127.0.0.1:{httpd.server_port}/api/v2")
+    monkeypatch.setattr(w, "LOOKUP_TIMEOUT", 1)
+    monkeypatch.setattr(w, "server", w.GameServer())    # 乾淨的查詢快取
+    DELAYS.clear(); MISSING.clear(); BROKEN.clear(); REQUESTS.clear()
+    yield
+    httpd.shutdown()
+    httpd.server_close()
+
+MOVES = ["fake-out", "knock-off", "parting-shot", "flare-blitz"]
+
+def test_lookups_run_concurrently(fake_api):
+    t0 = time.perf_counter()
+    species, move_names = w.translate_question_names("incineroar", MOVES, deadline=2)
+    elapsed = time.perf_counter() - t0
+    assert species[0] == len("incineroar") and species[3] == "Incineroar"
+    assert [j for _, j, _ in move_names] == ["ja-" + m for m in MOVES]
+    # 五個查詢各 0.3 秒，依序查要 1.5 秒
+    assert elapsed < 5 * DEFAULT_DELAY * 0.6
+
+def test_slow_move_degrades_to_raw_name_within_deadline(fake_api):
+    DELAYS["knock-off"] = 5
+    t0 = time.perf_counter()
+    species, move_names = w.translate_question_names("incineroar", MOVES, deadline=2)
+    elapsed = time.perf_counter() - t0
+    assert elapsed < 2 + 0.5
+    assert move_names[1] == ("knock-off", "knock-off", "knock-off")
+    assert move_names[0][1] == "ja-fake-out"
+    assert species[3] == "Incineroar"
+
+def test_species_miss_and_transient_failure_are_told_apart(fake_api):
+    MISSING.add("urshifu-rapid-strike")
+    BROKEN.add("incineroar")
+    missing, _ = w.translate_question_names("Urshifu-Rapid-Strike", MOVES[:1], deadline=2)
+    broken, _ = w.translate_question_names("Incineroar", MOVES[:1], deadline=2)
+    assert missing is None                      # 404：換一隻
+    assert broken == (None, None, None, None)   # 暫時查不到：不重抽
+
+def test_results_are_shared_between_sessions(fake_api):
+    w.translate_question_names("incineroar", MOVES, deadline=2)
+    DELAYS.update({name: 5 for name in ["incineroar"] + MOVES})
+    t0 = time.perf_counter()
+    species, move_names = w.translate_question_names("incineroar", MOVES, deadline=2)
+    assert time.perf_counter() - t0 < 0.2      # 第二次全部來自 server.lookups，沒有打網路
+    assert species[3] == "Incineroar" and move_names[0][1] == "ja-fake-out"
+
+def test_queued_lookups_are_cancelled_at_the_deadline(fake_api, monkeypatch):
+    # 只有一個 worker：物種查詢卡住時，招式查詢都還在排隊，時限一到就該被取消而不是之後再送出去
+    pool = w.ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(w, "get_lookup_pool", lambda: pool)
+    DELAYS["incineroar"] = 5
+    species, move_names = w.translate_question_names("incineroar", MOVES, deadline=0.5)
+    assert species == (None, None, None, None)
+    assert move_names == [(m, m, m) for m in MOVES]
+    pool.shutdown(wait=True)
+    assert REQUESTS == ["incineroar"]
@@ -0,0 +1,93 @@
+import statistics
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("opencc")
+
+import requests
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+import web_game_4 as w
+from conftest import SCRIPT, FakeResponse
+
+@pytest.fixture
+def fresh_server(monkeypatch):
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    monkeypatch.setattr(w, "server", w.GameServer())
+    def no_network(endpoint, name):
+        raise AssertionError(f"local warm-up must not call PokeAPI ({endpoint}/{name})")
+    monkeypatch.setattr(w, "fetch_pokeapi_names", no_network)
+    return w.server
+
+def test_local_warm_up_marks_ready_without_network(fresh_server):
+    timings = w.warm_up(health_check=True)
+    assert fresh_server.ready
+    assert fresh_server.warmup_error is None
+    assert list(timings) == [stage for stage, _ in w.WARMUP_LOCAL_STAGES]
+    # 健康檢查不該建出計分板 (scoreboard.db) 或開回合
+    assert fresh_server._scoreboard is None
+    assert fresh_server.current_q_move is None and fresh_server.current_q_stat is None
+
+class MainPasses:
+    """每次 main() 從進入到離開的耗時 (暖機閘門 st.rerun() 離開的那幾次也算一次)，
+    以及計分板是在哪個執行緒建出來的"""
+    def __init__(self):
+        self.seconds, self.scoreboard_threads = [], []
+
+    def __call__(self, frame, event, arg):
+        code = frame.f_code
+        if code.co_filename != SCRIPT: return None
+        if code.co_name == "_init_db":
+            self.scoreboard_threads.append(threading.current_thread().name)
+        elif code.co_name == "main":
+            # 只追 main() 這一層的 return，其他函式不追，量測本身不拖慢整頁
+            frame.f_trace_lines = False
+            started = time.perf_counter()
+            def on_return(frame, event, arg):
+                if event == "return": self.seconds.append(time.perf_counter() - started)
+            return on_return
+        return None
+
+@pytest.fixture
+def main_passes(app_env):
+    passes = MainPasses()
+    threading.settrace(passes)          # AppTest 每次 run 都開新的執行緒跑腳本，暖機也是新執行緒
+    yield passes
+    threading.settrace(None)
+
+def first_run(passes):
+    """開一個新連線跑第一次，回傳整頁那一次 main() 的耗時"""
+    before = len(passes.seconds)
+    at = AppTest.from_file(SCRIPT, default_timeout=30)
+    at.run()
+    assert not at.exception
+    return passes.seconds[before:][-1]
+
+@pytest.fixture
+def slow_pokeapi(monkeypatch):
+    """PokeAPI 一直不回應到測試結束：背景的網路階段只是在等，不跟量測的頁面搶 CPU，
+    每個連線畫的也都是同樣「還沒有題目」的畫面"""
+    api_open = threading.Event()
+    monkeypatch.setattr(requests, "get", lambda *a, **k: api_open.wait(10) and FakeResponse())
+    yield
+    api_open.set()
+
+def test_first_session_after_warm_up_is_as_fast_as_later_sessions(main_passes, slow_pokeapi):
+    firsts, laters = [], []
+    for _ in range(3):
+        # 清掉快取 = 重新開站：第一個連線觸發暖機，在閘門等到 ready 之後才畫整頁，這一頁就是「暖機後的第一個連線」
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        firsts.append(first_run(main_passes))
+        laters += [first_run(main_passes) for _ in range(3)]
+    first, later = statistics.median(firsts), statistics.median(laters)
+    # 計分板 (SQLite 建表、讀總分、背景寫入執行緒) 每次都在暖機執行緒建好，不是第一位訪客
+    assert len(main_passes.scoreboard_threads) == 3
+    assert all("warm_up" in name for name in main_passes.scoreboard_threads)
+    # 沒暖機的階段最小的也要將近 10 ms (move_cache)，題庫 (vgc_data) 更要上百 ms
+    assert first <= later * 1.2 + 0.005, f"first {first * 1000:.1f} ms, later {later * 1000:.1f} ms"
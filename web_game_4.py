@@ -5,6 +5,18 @@ import random
 import requests
 from opencc import OpenCC
 import time
+import sqlite3
+import threading
+import heapq
+import hashlib
+import sys
+import atexit
+import logging
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
 
 # --- 設定頁面資訊 ---
 st.set_page_config(page_title="GEN 9 PM Move Guess", page_icon="🎮", layout="centered")
@@ -18,23 +30,228 @@ TOP_N_POKEMON = 200
 TOP_N_MOVES_POOL = 20                       
 CLUES_NUM = 1                               
 DISTRACTOR_NUM = 3   
+POKEAPI_URL = "https://pokeapi.co/api/v2"
+LOOKUP_TIMEOUT = 3                          # 單次 PokeAPI 查詢的逾時 (秒)
+LOOKUP_CACHE_SIZE = 4096                    # 名稱查詢結果最多記幾筆 (物種 + 招式大約兩千)
+TRANSLATION_DEADLINE = LOOKUP_TIMEOUT + 1  # 一題所有名稱查詢的總時限 (秒)，比單次逾時長，慢的查詢會先自己逾時
+MAX_QUESTION_ATTEMPTS = 5                   # PokeAPI 沒有這隻 (404) 時最多重抽幾次
+LOOKUP_WORKERS = 16
+
+# 干擾招式的權重：越像真的配招越容易被抽到
+DISTRACTOR_WEIGHT_BASE = 1                  # 會學但沒人用的招式
+DISTRACTOR_WEIGHT_USAGE = 3                 # 出現在任一規則的使用率招式表
+DISTRACTOR_WEIGHT_TYPE = 2                  # 同屬性的 VGC 寶可夢有在用
 BANNED_MOVES = {"protect", "tera-blast", "substitute", "rest", "sleep-talk", "endure", "facade", "helping-hand"}
 
-# --- 初始化轉換器 ---
-if 'cc' not in st.session_state:
-    st.session_state.cc = OpenCC('s2t')
-cc = st.session_state.cc
+# --- 計分板設定 ---
+SCORE_DB_PATH = "scoreboard.db"
+SCORE_FLUSH_INTERVAL = 2.0                  # 每隔幾秒把暫存的紀錄一次寫進 SQLite
+SCORE_ROUNDS_IN_MEMORY = 50                 # 記憶體只保留最近幾回合的作答明細
+SCORE_MAX_POINTS = 100                      # 答對且秒答可拿的分數
+SCORE_MIN_POINTS = 10                       # 答對最少可拿的分數
+SCORE_DECAY_PER_SEC = 2                     # 每晚一秒扣幾分
+LEADERBOARD_SIZE = 10
+ANSWER_PLACEHOLDERS = {'', 'n/a', 'none'}   # 查不到名稱時的佔位字，不能拿來當正解
+REVEAL_CACHE_SIZE = 256                     # 最多保留幾題的看答案結果
+
+# --- 種子模式設定 ---
+SEED_MIN, SEED_MAX = 100000, 999999          # 6 位數種子，方便裁判口頭公布
+
+# --- 初始化轉換器 (所有連線共用一個，暖機時建好) ---
+@st.cache_resource
+def get_converter():
+    return OpenCC('s2t')
 
 # ==========================================
 # ★★★ 核心修改：多人連線共享狀態 ★★★
 # ==========================================
 
+class Scoreboard:
+    """多人計分板：作答先寫進記憶體，再由背景執行緒批次寫入 SQLite (write-behind)"""
+    def __init__(self, db_path=SCORE_DB_PATH):
+        self.db_path = os.path.abspath(db_path)     # 結束前的最後一次寫入也要寫回同一個檔案，不受之後 chdir 影響
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # 背景寫入與結束前的最後一次寫入不能同時跑
+        self.rounds = {}            # round_id -> {"kind", "answers", "published_at", "guesses"}
+        self.totals = {}            # player -> {"points", "correct", "answered"}
+        self.pending_rounds = []    # 還沒寫進 DB 的回合
+        self.pending_guesses = []   # 還沒寫進 DB 的作答
+        self.round_keys = {}        # 種子模式的 (題型, seed, 回合) -> round_id
+        self.next_round_id = 1
+        self._init_db()
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        # 背景執行緒是 daemon，行程結束前要自己把最後一批寫進去
+        atexit.register(self.close)
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS rounds (
+                    round_id INTEGER PRIMARY KEY, kind TEXT, answer_en TEXT, published_at REAL);
+                CREATE TABLE IF NOT EXISTS guesses (
+                    round_id INTEGER, player TEXT, guess TEXT, elapsed REAL,
+                    correct INTEGER, points INTEGER, PRIMARY KEY (round_id, player));
+                CREATE TABLE IF NOT EXISTS player_totals (
+                    player TEXT PRIMARY KEY, points INTEGER, correct INTEGER, answered INTEGER);
+                CREATE INDEX IF NOT EXISTS idx_totals_points ON player_totals (points DESC);
+            """)
+            # 總分另外存一張表，排行榜不需要每次掃過全部歷史作答
+            for player, points, correct, answered in conn.execute(
+                    "SELECT player, points, correct, answered FROM player_totals"):
+                self.totals[player] = {"points": points, "correct": correct, "answered": answered}
+            last_id = conn.execute("SELECT MAX(round_id) FROM rounds").fetchone()[0]
+            self.next_round_id = (last_id or 0) + 1
+        finally:
+            conn.close()
+
+    def open_round(self, kind, q, published_at, key=None):
+        """裁判發佈新題目時開一個回合，回傳 round_id；種子模式會多帶一個 key 讓選手自己查"""
+        answers = {str(q.get(k, '')).strip().lower() for k in ("answer_name", "answer_jp", "answer_en", "target_pm_name")}
+        answers -= ANSWER_PLACEHOLDERS
+        with self.lock:
+            round_id = self.next_round_id
+            self.next_round_id += 1
+            self.rounds[round_id] = {"kind": kind, "answers": answers, "published_at": published_at,
+                                    "guesses": {}, "revealed": set()}
+            self.pending_rounds.append((round_id, kind, q.get('answer_en'), published_at))
+            if key is not None: self.round_keys[key] = round_id
+            # 舊回合的明細已經在 DB 裡了，記憶體只留最近的
+            while len(self.rounds) > SCORE_ROUNDS_IN_MEMORY:
+                del self.rounds[min(self.rounds)]
+            while len(self.round_keys) > SCORE_ROUNDS_IN_MEMORY:
+                del self.round_keys[next(iter(self.round_keys))]
+        return round_id
+
+    def round_for(self, key):
+        """種子模式：用 (題型, seed, 回合) 找回對應的 round_id"""
+        with self.lock:
+            return self.round_keys.get(key)
+
+    def mark_revealed(self, round_id, player):
+        """選手看過答案，這回合之後的作答一律不算"""
+        with self.lock:
+            rnd = self.rounds.get(round_id)
+            if rnd is not None: rnd['revealed'].add(player)
+
+    def submit_guess(self, round_id, player, guess):
+        """記錄選手作答，回傳 (是否答對, 得分)；同一回合只算第一次作答，重複作答或已看過答案回傳 None"""
+        now = time.time()
+        with self.lock:
+            rnd = self.rounds.get(round_id)
+            if rnd is None or player in rnd['guesses'] or player in rnd['revealed']: return None
+            elapsed = now - rnd['published_at']
+            correct = guess.strip().lower() in rnd['answers']
+            points = max(SCORE_MIN_POINTS, SCORE_MAX_POINTS - int(elapsed * SCORE_DECAY_PER_SEC)) if correct else 0
+            rnd['guesses'][player] = (guess, elapsed, correct, points)
+            total = self.totals.setdefault(player, {"points": 0, "correct": 0, "answered": 0})
+            total['points'] += points
+            total['correct'] += int(correct)
+            total['answered'] += 1
+            self.pending_guesses.append((round_id, player, guess, elapsed, int(correct), points))
+        return correct, points
+
+    def leaderboard(self, limit=LEADERBOARD_SIZE):
+        """回傳 [(player, points, correct, answered), ...]，只看累計總分，跟歷史回合數無關"""
+        with self.lock:
+            top = heapq.nlargest(limit, self.totals.items(), key=lambda kv: (kv[1]['points'], kv[1]['correct']))
+        return [(p, t['points'], t['correct'], t['answered']) for p, t in top]
+
+    def flush(self, conn):
+        """把暫存的回合與作答一次寫進 DB (單一交易)"""
+        with self.flush_lock:
+            with self.lock:
+                rounds, self.pending_rounds = self.pending_rounds, []
+                guesses, self.pending_guesses = self.pending_guesses, []
+            if not rounds and not guesses: return
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO rounds VALUES (?, ?, ?, ?)", rounds)
+                    conn.executemany("INSERT OR IGNORE INTO guesses VALUES (?, ?, ?, ?, ?, ?)", guesses)
+                    conn.executemany("""
+                        INSERT INTO player_totals VALUES (?, ?, ?, 1)
+                        ON CONFLICT(player) DO UPDATE SET points = points + excluded.points,
+                            correct = correct + excluded.correct, answered = answered + 1
+                    """, [(g[1], g[5], g[4]) for g in guesses])
+            except sqlite3.Error:
+                # 寫入失敗就放回佇列，下一輪再試
+                with self.lock:
+                    self.pending_rounds[:0] = rounds
+                    self.pending_guesses[:0] = guesses
+                raise
+
+    def close(self):
+        """行程結束前把還沒寫進去的紀錄寫完"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try: self.flush(conn)
+            finally: conn.close()
+        except sqlite3.Error:
+            logger.exception("scoreboard: final flush to %s failed", self.db_path)
+
+    def _flush_loop(self):
+        # SQLite 連線不能跨執行緒，所以在背景執行緒自己開一條
+        try:
+            conn = sqlite3.connect(self.db_path)
+        except sqlite3.Error:
+            logger.exception("scoreboard: cannot open %s, answers will only be written at exit", self.db_path)
+            return
+        while True:
+            time.sleep(SCORE_FLUSH_INTERVAL)
+            try: self.flush(conn)
+            except sqlite3.Error: logger.exception("scoreboard: flush failed, will retry")
+
+class SingleFlight:
+    """同一個 key 同時只會算一次，其他請求等同一個結果；算好的結果保留最近 max_entries 筆"""
+    def __init__(self, max_entries=REVEAL_CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.futures = OrderedDict()    # key -> Future
+
+    def do(self, key, func):
+        with self.lock:
+            fut = self.futures.get(key)
+            owner = fut is None
+            if owner:
+                fut = self.futures[key] = Future()
+                while len(self.futures) > self.max_entries:
+                    self.futures.popitem(last=False)
+        if owner:
+            try: fut.set_result(func())
+            except BaseException as e:
+                # 失敗不留快取，下一個請求重算；st.rerun()/st.stop() 這類 BaseException 也要通知等待的人，不然會永遠卡在 result()
+                with self.lock:
+                    if self.futures.get(key) is fut: del self.futures[key]
+                fut.set_exception(e)
+        return fut.result()
+
 class GameServer:
     def __init__(self):
         # 這是公共佈告欄，存著現在的題目
         self.current_q_move = None  # 配招題的題目
         self.current_q_stat = None  # 種族值題的題目
         self.last_update_time = time.time()
+        self._scoreboard = None
+        self._scoreboard_lock = threading.Lock()
+        self.reveals = SingleFlight()   # question_id -> 看答案資料，全房間共用
+        self.lookups = SingleFlight(LOOKUP_CACHE_SIZE)  # (endpoint, 名稱) -> PokeAPI 查詢結果，全房間共用
+        # 種子模式：佈告欄只放整數，題目由每個選手在本地算出來
+        self.seed = None            # None 代表沒開種子模式
+        self.seed_round_move = 0
+        self.seed_round_stat = 0
+        # 暖機狀態：ready 之前 UI 只顯示載入畫面
+        self.ready = False
+        self.warmup_stage = None
+        self.warmup_timings = {}    # 階段名稱 -> 秒數
+        self.warmup_error = None
+
+    @property
+    def scoreboard(self):
+        """第一次用到才開 DB 與背景寫入執行緒，只 import 或跑健康檢查不會建出 scoreboard.db"""
+        with self._scoreboard_lock:
+            if self._scoreboard is None: self._scoreboard = Scoreboard()
+            return self._scoreboard
 
 # 使用 cache_resource 確保這個物件在所有使用者的連線中是「共用」的
 @st.cache_resource
@@ -49,7 +266,7 @@ server = get_server_state()
 def normalize_name(name):
     return str(name).lower().replace(' ', '-')
 
-@st.cache_data
+@st.cache_resource  # 唯讀共用，不用每次 rerun 都複製一份
 def load_vgc_data():
     all_pokemon_data = {} 
     if not os.path.exists(JSON_FOLDER_PATH): return {}
@@ -72,85 +289,150 @@ def load_vgc_data():
                 new_moves = valid_moves[:TOP_N_MOVES_POOL]
                 if name in all_pokemon_data:
                     all_pokemon_data[name]['moves'].extend(new_moves)
-                    all_pokemon_data[name]['moves'] = list(set(all_pokemon_data[name]['moves']))
+                    all_pokemon_data[name]['moves'] = sorted(set(all_pokemon_data[name]['moves']))  # 排序，確保每個行程順序一致
                 else:
-                    all_pokemon_data[name] = {"moves": new_moves, "source": source_name, "rank": current_rank}
+                    all_pokemon_data[name] = {"moves": new_moves, "source": source_name, "rank": current_rank, "types": pm.get('types', [])}
         except: pass
     return all_pokemon_data
 
 @st.cache_data
+def load_snapshot_version():
+    """資料快照版本：所有題庫檔案內容的雜湊，檔案一變版本就不同"""
+    h = hashlib.sha1(f"{TOP_N_POKEMON}:{TOP_N_MOVES_POOL}:{CLUES_NUM}:{DISTRACTOR_NUM}:"
+                     f"{DISTRACTOR_WEIGHT_BASE}:{DISTRACTOR_WEIGHT_USAGE}:{DISTRACTOR_WEIGHT_TYPE}".encode())
+    paths = [CACHE_PATH_MOVES, CACHE_PATH_STATS]
+    if os.path.exists(JSON_FOLDER_PATH):
+        paths += sorted(os.path.join(JSON_FOLDER_PATH, f) for f in os.listdir(JSON_FOLDER_PATH) if f.endswith('.json'))
+    for path in paths:
+        if not os.path.exists(path): continue
+        h.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f: h.update(f.read())
+    return h.hexdigest()[:8]
+
+@st.cache_resource
 def load_move_cache():
     if os.path.exists(CACHE_PATH_MOVES):
         with open(CACHE_PATH_MOVES, 'r', encoding='utf-8') as f: return json.load(f)
     return {}
 
-@st.cache_data
+@st.cache_resource
 def load_stat_cache():
     if os.path.exists(CACHE_PATH_STATS):
         with open(CACHE_PATH_STATS, 'r', encoding='utf-8') as f: return json.load(f)
     return {}
 
+class LookupFailed(Exception):
+    """PokeAPI 暫時查不到 (逾時、連線錯誤、5xx)，跟 404 的「真的沒有」分開"""
+
+def fetch_pokeapi_names(endpoint, name):
+    """查 PokeAPI 的 id 與各語言名稱，回傳 {"id", "names": {語言: 名稱}}；404 回傳 None。
+    結果 (包含 404) 記在 server.lookups 給所有連線共用，同時查同一個名稱只會送一次；暫時性錯誤丟 LookupFailed 且不記"""
+    def fetch():
+        try:
+            response = requests.get(f"{POKEAPI_URL}/{endpoint}/{name}", timeout=LOOKUP_TIMEOUT)
+            if response.status_code == 404: return None
+            if response.status_code != 200: raise LookupFailed(f"HTTP {response.status_code}")
+            data = response.json()
+            return {"id": data['id'], "names": {e['language']['name']: e['name'] for e in data['names']}}
+        except (requests.RequestException, ValueError, KeyError) as e:
+            raise LookupFailed(repr(e)) from e
+    return server.lookups.do((endpoint, name), fetch)
+
 def get_pokemon_names_api(name_or_id):
-    url = f"https://pokeapi.co/api/v2/pokemon-species/{name_or_id}"
-    try:
-        response = requests.get(url, timeout=3)
-        if response.status_code != 200: return None, None, None, None
-        data = response.json()
-        pm_id = data['id'] 
-        ja, en = 'N/A', 'N/A'
-        zh_hant, zh_hans = None, None
-        for entry in data['names']:
-            lang = entry['language']['name']
-            if lang == 'en': en = entry['name']
-            elif lang == 'ja': ja = entry['name']
-            elif lang == 'zh-Hant': zh_hant = entry['name']
-            elif lang == 'zh-Hans': zh_hans = entry['name']
-        raw_zh = zh_hant if zh_hant else zh_hans
-        final_zh = cc.convert(raw_zh) if raw_zh else 'N/A'
-        return pm_id, ja, final_zh, en
-    except: return None, None, None, None
+    """回傳 (id, ja, zh, en)；PokeAPI 沒有這個物種回傳 None，暫時查不到丟 LookupFailed"""
+    data = fetch_pokeapi_names("pokemon-species", normalize_name(name_or_id))
+    if data is None: return None
+    names = data['names']
+    raw_zh = names.get('zh-Hant') or names.get('zh-Hans')
+    final_zh = get_converter().convert(raw_zh) if raw_zh else 'N/A'
+    return data['id'], names.get('ja', 'N/A'), final_zh, names.get('en', 'N/A')
 
 def get_move_info(move_name):
-    formatted_name = normalize_name(move_name)
-    url = f"https://pokeapi.co/api/v2/move/{formatted_name}"
-    try:
-        response = requests.get(url, timeout=3)
-        if response.status_code != 200: return move_name, move_name, move_name 
-        data = response.json()
-        ja, en, zh_hant, zh_hans = None, None, None, None
-        for entry in data['names']:
-            lang = entry['language']['name']
-            if lang == 'ja': ja = entry['name']
-            elif lang == 'en': en = entry['name'] 
-            elif lang == 'zh-Hant': zh_hant = entry['name']
-            elif lang == 'zh-Hans': zh_hans = entry['name']
-        raw_zh = zh_hant if zh_hant else zh_hans
-        final_zh = cc.convert(raw_zh) if raw_zh else move_name
-        final_zh = final_zh.replace('巖', '岩')
-        return final_zh, ja or move_name, en or move_name
-    except: return move_name, move_name, move_name
-
-def get_random_moves_from_cache(full_db, pokemon_name, excluded_moves, count=3):
+    try: data = fetch_pokeapi_names("move", normalize_name(move_name))
+    except LookupFailed: data = None
+    if data is None: return move_name, move_name, move_name
+    names = data['names']
+    raw_zh = names.get('zh-Hant') or names.get('zh-Hans')
+    final_zh = get_converter().convert(raw_zh) if raw_zh else move_name
+    final_zh = final_zh.replace('巖', '岩')
+    return final_zh, names.get('ja') or move_name, names.get('en') or move_name
+
+@st.cache_resource
+def get_lookup_pool():
+    """查 PokeAPI 用的共用執行緒池"""
+    return ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="pokeapi")
+
+def translate_question_names(pokemon_name, moves, deadline=TRANSLATION_DEADLINE):
+    """物種與所有招式同時查，整題最多等 deadline 秒；逾時的招式退回英文原名。
+    物種回傳 (id, ja, zh, en)，PokeAPI 沒有這個物種是 None，逾時或暫時查不到是全 None 的 tuple"""
+    pool = get_lookup_pool()
+    species_fut = pool.submit(get_pokemon_names_api, pokemon_name)
+    move_futs = [pool.submit(get_move_info, m) for m in moves]
+    done, pending = wait([species_fut] + move_futs, timeout=deadline)
+    # 還在排隊沒開始的查詢直接取消，不要佔住共用的 worker；已經在跑的最多再 LOOKUP_TIMEOUT 秒就會結束
+    for f in pending: f.cancel()
+    try: species = species_fut.result() if species_fut in done else (None, None, None, None)
+    except LookupFailed: species = (None, None, None, None)
+    move_names = [f.result() if f in done else (m, m, m) for f, m in zip(move_futs, moves)]
+    return species, move_names
+
+def find_cache_entry(full_db, pokemon_name):
+    """模糊比對解決形態名稱問題 (如 Landorus -> landorus-incarnate)"""
     target_key = normalize_name(pokemon_name)
-    if target_key in full_db: pm_data = full_db[target_key]
-    else:
-        found_key = None
-        for key in full_db.keys():
-            if key.startswith(target_key + "-"):
-                found_key = key
-                break
-        if found_key: pm_data = full_db[found_key]
-        else: return []
-    all_moves_data = pm_data.get('moves', [])
-    excluded_set = {normalize_name(m) for m in excluded_moves}
-    candidate_moves = []
-    for move_name in all_moves_data:
-        norm_move = normalize_name(move_name)
-        if norm_move not in excluded_set and norm_move not in BANNED_MOVES:
-            candidate_moves.append(move_name)
-    actual_count = min(count, len(candidate_moves))
-    if actual_count == 0: return []
-    return random.sample(candidate_moves, actual_count)
+    if target_key in full_db: return full_db[target_key]
+    for key in full_db.keys():
+        if key.startswith(target_key + "-"): return full_db[key]
+    return None
+
+@st.cache_resource
+def load_distractor_pools():
+    """載入時一次建好每隻 PM 的干擾招式池：正規化、排除禁招，存成招式編號陣列與累積權重"""
+    vgc_db, move_cache = load_vgc_data(), load_move_cache()
+    usage_moves = set()
+    type_moves = {}             # 屬性 -> 該屬性 VGC 寶可夢用過的招式
+    for pm in vgc_db.values():
+        norm_moves = {normalize_name(m) for m in pm['moves']}
+        usage_moves |= norm_moves
+        for t in pm.get('types', []): type_moves.setdefault(t, set()).update(norm_moves)
+
+    vocab, vocab_index, pools = [], {}, {}
+    for name, pm in vgc_db.items():
+        entry = find_cache_entry(move_cache, name)
+        same_type = set().union(*(type_moves.get(t, set()) for t in pm.get('types', [])))
+        idx, cum, total, seen = array('H'), array('d'), 0.0, set()
+        for move_name in (entry or {}).get('moves', []):
+            norm_move = normalize_name(move_name)
+            if norm_move in BANNED_MOVES or norm_move in seen: continue
+            seen.add(norm_move)
+            if norm_move not in vocab_index:
+                vocab_index[norm_move] = len(vocab)
+                vocab.append(move_name)
+            total += (DISTRACTOR_WEIGHT_BASE
+                      + DISTRACTOR_WEIGHT_USAGE * (norm_move in usage_moves)
+                      + DISTRACTOR_WEIGHT_TYPE * (norm_move in same_type))
+            idx.append(vocab_index[norm_move])
+            cum.append(total)
+        pools[name] = (idx, cum)
+    return {"vocab": vocab, "index": vocab_index, "pools": pools}
+
+def sample_distractors(pokemon_name, excluded_moves, count=3, rng=random):
+    """依權重抽 count 個不重複的干擾招式 (每次抽 O(log n)，不再整個招式表重掃)"""
+    data = load_distractor_pools()
+    idx, cum = data['pools'].get(pokemon_name, (array('H'), array('d')))
+    excluded = {data['index'].get(normalize_name(m)) for m in excluded_moves}
+    excluded.discard(None)      # 不在招式表裡的線索招式抽不到，不算進「池子太小」的判斷
+    if len(idx) <= count + len(excluded):
+        # 池子太小就全部拿，不用抽
+        picked = [i for i in idx if i not in excluded]
+        rng.shuffle(picked)
+        return [data['vocab'][i] for i in picked[:count]]
+    picked, seen = [], set(excluded)
+    while len(picked) < count:
+        i = rng.choices(idx, cum_weights=cum)[0]
+        if i not in seen:
+            seen.add(i)
+            picked.append(i)
+    return [data['vocab'][i] for i in picked]
 
 def find_other_matches(full_db, quiz_moves, current_answer_en_name):
     if not full_db: return []
@@ -164,48 +446,82 @@ def find_other_matches(full_db, quiz_moves, current_answer_en_name):
             matches.append(f"{names.get('zh', pm_key)} | {names.get('ja', 'N/A')} | {names.get('en', pm_key)}")
     return matches
 
+ARTWORK_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/{}.png"
+
+def question_id(q):
+    """題目識別碼：同一題不論從哪個連線拿到都一樣"""
+    key = [q['answer_id'], q.get('moves_raw') or q.get('stats')]
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:12]
+
+def compute_reveal_data(q, move_cache=None):
+    """看答案用的衍生資料 (同配招的其他 PM、圖片網址)"""
+    others = find_other_matches(move_cache, q['moves_raw'], q['target_pm_name']) if move_cache is not None else []
+    return {"others": others, "img_url": ARTWORK_URL.format(q['answer_id']) if q['answer_id'] else None}
+
+def get_reveal_data(q, move_cache=None):
+    """整個房間共用的看答案資料：每題只算一次，同時按的人等同一份結果，算完掛回題目上"""
+    reveal = q.get('reveal')
+    if reveal is None:
+        reveal = server.reveals.do(question_id(q), lambda: compute_reveal_data(q, move_cache))
+        q['reveal'] = reveal
+    return reveal
+
 def get_pokemon_id(name_or_id):
-    url = f"https://pokeapi.co/api/v2/pokemon-species/{name_or_id}"
-    try:
-        response = requests.get(url, timeout=3)
-        if response.status_code == 200: return response.json()['id']
-    except: return None
-    return None
+    """PokeAPI 沒有這個物種回傳 None，暫時查不到丟 LookupFailed"""
+    data = fetch_pokeapi_names("pokemon-species", normalize_name(name_or_id))
+    return data['id'] if data else None
 
 # ==========================================
 # 題目生成 (修改版：支援寫入 Server State)
 # ==========================================
 
-def generate_move_question(vgc_db, move_cache, is_admin=False):
-    """產生配招題目"""
+def question_rng(seed, round_no, kind, version):
+    """同一組 (seed, 回合, 題型, 資料版本) 在任何行程都會得到同一串亂數 (字串種子走 sha512，不受 hash 隨機化影響)"""
+    return random.Random(f"{seed}:{round_no}:{kind}:{version}")
+
+def attempt_rng(seed, round_no, kind, attempt):
+    """第 attempt 次抽題用的 rng：沒有種子用全域 random；有種子時每次重抽都從 (seed, 回合/第幾次) 重新開始，
+    不會因為前一次抽到一半失敗而接著用已經走掉的亂數"""
+    if seed is None: return random
+    label = round_no if attempt == 0 else f"{round_no}/{attempt}"
+    return question_rng(seed, label, kind, load_snapshot_version())
+
+def generate_move_question(vgc_db, move_cache, is_admin=False, seed=None, round_no=None):
+    """產生配招題目 (沒給 seed 用全域 random；種子模式只由 seed、回合與資料決定)"""
     if not vgc_db: return
     
     # 邏輯：如果你是裁判(Admin)，你負責產生新題目並寫入佈告欄
     # 如果你是選手，你只是去佈告欄抄題目，自己不能產生
     
-    target_pm_name = random.choice(list(vgc_db.keys()))
-    pm_data = vgc_db[target_pm_name]
-    raw_move_pool = pm_data['moves']
-    
-    valid_vgc_pool = [m for m in raw_move_pool if normalize_name(m) not in BANNED_MOVES]
-    if not valid_vgc_pool: valid_vgc_pool = raw_move_pool
-    id, jpn, chn, enn = get_pokemon_names_api(target_pm_name)
-    if id is None: return generate_move_question(vgc_db, move_cache, is_admin)
-    if len(valid_vgc_pool) < CLUES_NUM: vgc_moves = valid_vgc_pool
-    else: vgc_moves = random.sample(valid_vgc_pool, CLUES_NUM)
-    random_fillers = get_random_moves_from_cache(move_cache, target_pm_name, vgc_moves, count=DISTRACTOR_NUM)
-    final_move_list = []
-    seen = set()
-    for m in (vgc_moves + random_fillers):
-        norm = normalize_name(m)
-        if norm not in seen:
-            final_move_list.append(m)
-            seen.add(norm)
-    random.shuffle(final_move_list)
-    translated_moves = []
-    for m in final_move_list:
-        z, j, e = get_move_info(m)
-        translated_moves.append(f"**{z}**\n\n{j}\n\n*{e}*") 
+    for attempt in range(MAX_QUESTION_ATTEMPTS):
+        rng = attempt_rng(seed, round_no, "move", attempt)
+        target_pm_name = rng.choice(list(vgc_db.keys()))
+        pm_data = vgc_db[target_pm_name]
+        raw_move_pool = pm_data['moves']
+
+        valid_vgc_pool = [m for m in raw_move_pool if normalize_name(m) not in BANNED_MOVES]
+        if not valid_vgc_pool: valid_vgc_pool = raw_move_pool
+        if len(valid_vgc_pool) < CLUES_NUM: vgc_moves = valid_vgc_pool
+        else: vgc_moves = rng.sample(valid_vgc_pool, CLUES_NUM)
+        random_fillers = sample_distractors(target_pm_name, vgc_moves, count=DISTRACTOR_NUM, rng=rng)
+        final_move_list = []
+        seen = set()
+        for m in (vgc_moves + random_fillers):
+            norm = normalize_name(m)
+            if norm not in seen:
+                final_move_list.append(m)
+                seen.add(norm)
+        rng.shuffle(final_move_list)
+        # 名稱查詢一次全部送出，最慢約等於一次來回
+        species, move_names = translate_question_names(target_pm_name, final_move_list)
+        if species is not None: break   # None 代表 PokeAPI 沒有這個物種，換一隻
+    else: return None
+    id, jpn, chn, enn = species
+    if id is None:
+        # 暫時查不到不重抽 (重抽會讓種子模式各連線拿到不同題目)，名稱改用快取裡的，只是沒有圖
+        names = (find_cache_entry(move_cache, target_pm_name) or {}).get('names', {})
+        chn, jpn, enn = names.get('zh', target_pm_name), names.get('ja', 'N/A'), names.get('en', target_pm_name)
+    translated_moves = [f"**{z}**\n\n{j}\n\n*{e}*" for z, j, e in move_names]
 
     new_q = {
         "moves_display": translated_moves,
@@ -214,29 +530,30 @@ def generate_move_question(vgc_db, move_cache, is_admin=False):
         "target_pm_name": target_pm_name, "source": pm_data['source'], "rank": pm_data['rank']
     }
     
-    # ★★★ 寫入公共佈告欄 ★★★
-    server.current_q_move = new_q
-    server.last_update_time = time.time()
+    # ★★★ 寫入公共佈告欄 (只有裁判出的題目才算回合、才計分) ★★★
+    if is_admin:
+        server.last_update_time = time.time()
+        new_q["round_id"] = server.scoreboard.open_round("move", new_q, server.last_update_time)
+        server.current_q_move = new_q
     return new_q
 
-def generate_stat_question(vgc_db, stat_cache, is_admin=False):
+def generate_stat_question(vgc_db, stat_cache, is_admin=False, seed=None, round_no=None):
     """產生種族值題目"""
     if not vgc_db: return
-    target_pm_name = random.choice(list(vgc_db.keys()))
-    pm_data_vgc = vgc_db[target_pm_name]
-    target_key = normalize_name(target_pm_name)
-    pm_cache_data = None
-    if target_key in stat_cache: pm_cache_data = stat_cache[target_key]
-    else:
-        for key in stat_cache.keys():
-            if key.startswith(target_key + "-"):
-                pm_cache_data = stat_cache[key]
-                break
-    if not pm_cache_data: return generate_stat_question(vgc_db, stat_cache, is_admin)
+    for attempt in range(MAX_QUESTION_ATTEMPTS):
+        rng = attempt_rng(seed, round_no, "stat", attempt)
+        target_pm_name = rng.choice(list(vgc_db.keys()))
+        pm_data_vgc = vgc_db[target_pm_name]
+        pm_cache_data = find_cache_entry(stat_cache, target_pm_name)
+        if not pm_cache_data: continue
+        try: pm_id = get_pokemon_id(target_pm_name)
+        except LookupFailed:
+            pm_id = None    # 暫時查不到不重抽 (重抽會讓種子模式各連線拿到不同題目)，只是沒有圖
+            break
+        if pm_id: break     # None 代表 PokeAPI 沒有這個物種，換一隻
+    else: return None
     stats = pm_cache_data.get('stats', {})
     names = pm_cache_data.get('names', {})
-    pm_id = get_pokemon_id(target_pm_name)
-    if not pm_id: return generate_stat_question(vgc_db, stat_cache, is_admin)
 
     new_q = {
         "stats": stats,
@@ -247,84 +564,231 @@ def generate_stat_question(vgc_db, stat_cache, is_admin=False):
         "source": pm_data_vgc['source'], "rank": pm_data_vgc['rank']
     }
     
-    # ★★★ 寫入公共佈告欄 ★★★
-    server.current_q_stat = new_q
-    server.last_update_time = time.time()
+    # ★★★ 寫入公共佈告欄 (只有裁判出的題目才算回合、才計分) ★★★
+    if is_admin:
+        server.last_update_time = time.time()
+        new_q["round_id"] = server.scoreboard.open_round("stat", new_q, server.last_update_time)
+        server.current_q_stat = new_q
     return new_q
 
 # ==========================================
-# 主程式 UI
+# 種子模式：佈告欄只放 (seed, 回合)，題目在各自的連線算出來
 # ==========================================
 
-vgc_db = load_vgc_data()
-if not vgc_db:
-    st.error("❌ 找不到 VGC JSON 資料。")
-    st.stop()
+QUESTION_GENERATORS = {"move": generate_move_question, "stat": generate_stat_question}
 
-# --- 側邊欄：權限設定 ---
-st.sidebar.title("Setting")
-is_admin = st.sidebar.toggle("Host", value=False)
+def generate_seeded_question(kind, vgc_db, cache, seed, round_no):
+    """純粹由 (seed, 回合, 資料版本) 決定題目，不寫佈告欄"""
+    return QUESTION_GENERATORS[kind](vgc_db, cache, seed=seed, round_no=round_no)
 
-admin_input = st.sidebar.text_input("password", type="password")
-ADMIN_PASSWORD = "bobohost"
+def host_next_question(kind, vgc_db, cache):
+    """裁判出下一題：種子模式先開好計分回合，再把回合數 +1 公布出去。
+    種子模式的題目也貼上佈告欄，關掉種子模式後選手同步到的是裁判最新的一題，不是開種子模式前的舊題"""
+    if server.seed is None:
+        return QUESTION_GENERATORS[kind](vgc_db, cache, is_admin=True)
+    seed, round_no = server.seed, getattr(server, f"seed_round_{kind}") + 1
+    q = generate_seeded_question(kind, vgc_db, cache, seed, round_no)
+    if q is None: return None
+    server.last_update_time = time.time()
+    q["round_id"] = server.scoreboard.open_round(kind, q, server.last_update_time, key=(kind, seed, round_no))
+    setattr(server, f"current_q_{kind}", q)
+    setattr(server, f"seed_round_{kind}", round_no)
+    return q
+
+def sync_question(kind, vgc_db, cache):
+    """選手同步裁判的題目：種子模式在本地重算 (晚加入也能立刻跟上)，否則直接抄佈告欄"""
+    seed = server.seed
+    if seed is None:
+        return server.current_q_move if kind == "move" else server.current_q_stat
+    round_no = getattr(server, f"seed_round_{kind}")
+    if round_no == 0: return None
+    q = generate_seeded_question(kind, vgc_db, cache, seed, round_no)
+    if q is None: return None
+    q["round_id"] = server.scoreboard.round_for((kind, seed, round_no))
+    return q
+
+def self_play_question(kind, vgc_db, cache):
+    """自己玩：每個連線有自己的種子，按一次回合數 +1 (不計分)"""
+    if 'self_seed' not in st.session_state:
+        st.session_state.self_seed = random.randint(SEED_MIN, SEED_MAX)
+    round_key = f"self_round_{kind}"
+    st.session_state[round_key] = st.session_state.get(round_key, 0) + 1
+    return generate_seeded_question(kind, vgc_db, cache, st.session_state.self_seed, st.session_state[round_key])
 
-is_admin = False
-if admin_input == ADMIN_PASSWORD:
-    is_admin = True
-    st.sidebar.success("你負責出題，並可以看到答案")
-else:
-    if admin_input: # 如果有輸入但錯誤
-        st.sidebar.error("❌ 密碼錯誤")
-    else:
-        st.sidebar.info("👤 目前身分：選手")
+# ==========================================
+# 暖機：把共用資料一次建好，第一位訪客不用等
+# ==========================================
 
-tab1, tab2 = st.tabs(["move guess", "base stats guess"])
+def _warm_first_question(kind):
+    # 佈告欄是空的才先出一題，重啟後裁判跟選手一進來就有題目
+    if (server.current_q_move if kind == "move" else server.current_q_stat) is None:
+        vgc_db = load_vgc_data()
+        cache = load_move_cache() if kind == "move" else load_stat_cache()
+        if vgc_db and cache: host_next_question(kind, vgc_db, cache)
+
+# 只讀本機檔案的階段：跑完就可以開放畫面
+WARMUP_LOCAL_STAGES = [
+    ("vgc_data", load_vgc_data),
+    ("move_cache", load_move_cache),
+    ("stat_cache", load_stat_cache),
+    ("distractor_pools", load_distractor_pools),
+    ("snapshot_version", load_snapshot_version),
+    ("opencc", get_converter),
+]
+# 開計分板 (建表、讀回總分、啟動背景寫入)：開放前建好，第一位訪客的側邊欄排行榜不用等；健康檢查不跑，不留下 scoreboard.db
+WARMUP_SERVING_STAGES = [
+    ("scoreboard", lambda: server.scoreboard),
+]
+# 要查 PokeAPI 的階段：開放之後才在背景跑，網路慢或掛掉都不會卡住載入畫面
+WARMUP_NETWORK_STAGES = [
+    ("first_move_question", lambda: _warm_first_question("move")),
+    ("first_stat_question", lambda: _warm_first_question("stat")),
+]
+
+def _run_warmup_stages(stages):
+    for stage, func in stages:
+        server.warmup_stage = stage
+        t0 = time.perf_counter()
+        try: func()
+        except Exception as e:
+            server.warmup_error = f"{stage}: {e!r}"
+            return
+        finally: server.warmup_stage = None
+        server.warmup_timings[stage] = time.perf_counter() - t0
+
+def warm_up(health_check=False):
+    """先跑本機階段與計分板並標記 ready，再跑需要網路的階段；回傳 {階段: 秒數}。
+    health_check=True 只跑唯讀的本機階段。出錯也會標記 ready，之後改走原本的延遲載入"""
+    try:
+        _run_warmup_stages(WARMUP_LOCAL_STAGES)
+        if not health_check and not server.warmup_error: _run_warmup_stages(WARMUP_SERVING_STAGES)
+    finally: server.ready = True
+    if not health_check and not server.warmup_error: _run_warmup_stages(WARMUP_NETWORK_STAGES)
+    return server.warmup_timings
+
+@st.cache_resource
+def start_warm_up():
+    """每個行程只會啟動一次的背景暖機"""
+    thread = threading.Thread(target=warm_up, daemon=True)
+    thread.start()
+    return thread
 
 # ==========================================
-# 分頁 1: 猜配招
+# 主程式 UI
 # ==========================================
-with tab1:
+
+ADMIN_PASSWORD = "bobohost"
+is_admin = False        # 由 main() 每次執行時設定，各 fragment 讀這兩個值
+player_name = ""
+
+# --- 側邊欄：排行榜 (自己定時刷新，不用整頁 rerun) ---
+@st.fragment(run_every=SCORE_FLUSH_INTERVAL * 2)
+def leaderboard_panel():
+    st.subheader("🏆 排行榜")
+    board = server.scoreboard.leaderboard()
+    if board:
+        for rank, (name, points, correct, answered) in enumerate(board, start=1):
+            st.write(f"{rank}. **{name}** — {points} 分 ({correct}/{answered})")
+    else:
+        st.caption("還沒有人得分")
+
+def reveal_answer(q, flag_key):
+    """按下看答案：打開答案區，並把這回合記成看過答案 (重新同步也不能再作答)"""
+    st.session_state[flag_key] = True
+    round_id = q.get('round_id')
+    if is_admin or round_id is None: return
+    st.session_state.setdefault('revealed_rounds', set()).add(round_id)
+    if player_name: server.scoreboard.mark_revealed(round_id, player_name)
+
+def render_guess_box(q, key):
+    """選手在裁判出的題目下作答 (自己玩的題目沒有 round_id，不計分)"""
+    round_id = q.get('round_id')
+    if is_admin or round_id is None: return
+    if round_id in st.session_state.get('revealed_rounds', set()):
+        st.caption("這題已經看過答案，不計分")
+        return
+    if not player_name:
+        st.caption("在側邊欄輸入暱稱就可以作答計分")
+        return
+    with st.form(key=f"{key}_{round_id}", clear_on_submit=True):
+        guess = st.text_input("你的答案 (中文 / 日文 / 英文皆可)")
+        submitted = st.form_submit_button("✅ 送出答案")
+    if submitted and guess.strip():
+        result = server.scoreboard.submit_guess(round_id, player_name, guess)
+        if result is None: st.warning("這題已經作答過或看過答案了！")
+        elif result[0]: st.success(f"答對了！+{result[1]} 分")
+        else: st.error("答錯了！")
+
+# ==========================================
+# 各區塊用 st.fragment 包起來：按鈕只會重跑自己所在的區塊
+# ==========================================
+
+@st.fragment
+def move_reveal_panel(q, move_cache):
+    """配招題的作答 / 看答案區"""
+    # 顯示答案邏輯：
+    # 1. 裁判永遠看得到答案區 (但可以選擇要不要按開)
+    # 2. 選手只有在自己按了「看答案」後才看得到
+    # 3. 為了方便裁判，我們可以在這直接顯示小抄
+    if st.button("👁️ 看答案", use_container_width=True):
+        reveal_answer(q, 'show_answer')
+
+    if is_admin:
+        st.caption(f"答案是 **{q['answer_name']}**")
+    elif not st.session_state.get('show_answer', False):
+        render_guess_box(q, "move_guess")
+
+    if st.session_state.get('show_answer', False):
+        st.divider()
+        st.success(f"### 答案：{q['answer_name']} ({q['answer_jp']})")
+        st.caption(f"英文: {q['answer_en']} | ID: #{q['answer_id']}")
+        st.write(f"📊 **來源紀錄**: `{q['source']}` (Rank: #{q['rank']})")
+        with st.spinner("正在檢查是否有其他寶可夢會這四招..."):
+            reveal = get_reveal_data(q, move_cache)
+        if reveal['img_url']: st.image(reveal['img_url'], width=200)
+        if reveal['others']:
+            st.warning(f"還有 {len(reveal['others'])} 隻PM也會這組配招：")
+            for o in reveal['others']: st.write(f"- {o}")
+        else:
+            st.balloons()
+            st.info("唯一解 (Unique)")
+
+@st.fragment
+def move_panel(vgc_db):
+    """配招題：出題 / 同步按鈕與題目"""
     move_cache = load_move_cache()
-    
+
     # 檢查是否需要初始化 (如果是選手，就先讀 Server 的)
     if 'current_q' not in st.session_state:
-        if server.current_q_move:
-             st.session_state.current_q = server.current_q_move
+        synced_q = sync_question("move", vgc_db, move_cache)
+        if synced_q:
+             st.session_state.current_q = synced_q
         elif is_admin: # 如果 Server 是空的且我是裁判，我先出一題
-             st.session_state.current_q = generate_move_question(vgc_db, move_cache, is_admin=True)
-
-    # 顯示按鈕區
-    col1, col2 = st.columns([1, 1])
-    with col1:
-        if is_admin:
-            # 裁判按鈕：產生新題目並推送到 Server
-            if st.button("🔄 下一題", use_container_width=True, type="primary"):
-                q = generate_move_question(vgc_db, move_cache, is_admin=True)
-                st.session_state.current_q = q
-                st.rerun()
-        else:
+             st.session_state.current_q = host_next_question("move", vgc_db, move_cache)
+
+    # 按鈕在題目之前處理，同一次執行就會畫出新題目，不需要再 st.rerun()
+    if is_admin:
+        # 裁判按鈕：產生新題目並推送到 Server
+        if st.button("🔄 下一題", use_container_width=True, type="primary"):
+            st.session_state.current_q = host_next_question("move", vgc_db, move_cache)
+            if st.session_state.current_q is None: st.warning("出題失敗，請再按一次")
+    else:
+        col1, col2 = st.columns([1, 1])
+        with col1:
             if st.button("🎲 下一題 (自己玩)", use_container_width=True):
-                q = generate_move_question(vgc_db, move_cache, is_admin=False)
-                st.session_state.current_q = q
+                st.session_state.current_q = self_play_question("move", vgc_db, move_cache)
                 st.session_state.show_answer = False
-                st.rerun()
+        with col2:
             # 選手按鈕：去 Server 抓題目
             if st.button("📥 同步題目", use_container_width=True):
-                if server.current_q_move:
-                    st.session_state.current_q = server.current_q_move
+                synced_q = sync_question("move", vgc_db, move_cache)
+                if synced_q:
+                    st.session_state.current_q = synced_q
                     st.session_state.show_answer = False # 同步時先把答案蓋起來
-                    st.success("已同步裁判的題目！")
-                    time.sleep(0.5)
-                    st.rerun()
+                    st.toast("已同步裁判的題目！")
                 else:
                     st.warning("裁判還沒出題喔！")
 
-    with col2:
-        # 看答案按鈕
-        if st.button("👁️ 看答案", use_container_width=True):
-            st.session_state.show_answer = True
-            st.rerun()
-
     # 顯示題目
     q = st.session_state.get('current_q')
     if q:
@@ -332,95 +796,152 @@ with tab1:
         m_cols = st.columns(4)
         for i, move_text in enumerate(q['moves_display']):
             with m_cols[i % 4]: st.info(move_text)
-
-        # 顯示答案邏輯：
-        # 1. 裁判永遠看得到答案區 (但可以選擇要不要按開)
-        # 2. 選手只有在自己按了「看答案」後才看得到
-        # 3. 為了方便裁判，我們可以在這直接顯示小抄
-        
-        if is_admin:
-            st.caption(f"答案是 **{q['answer_name']}**")
-
-        if st.session_state.get('show_answer', False):
-            st.divider()
-            st.success(f"### 答案：{q['answer_name']} ({q['answer_jp']})")
-            st.caption(f"英文: {q['answer_en']} | ID: #{q['answer_id']}")
-            st.write(f"📊 **來源紀錄**: `{q['source']}` (Rank: #{q['rank']})")
-            img_url = f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/{q['answer_id']}.png"
-            st.image(img_url, width=200)
-
-            with st.spinner("正在檢查是否有其他寶可夢會這四招..."):
-                others = find_other_matches(move_cache, q['moves_raw'], q['target_pm_name'])
-            if others:
-                st.warning(f"還有 {len(others)} 隻PM也會這組配招：")
-                for o in others: st.write(f"- {o}")
-            else:
-                st.balloons() 
-                st.info("唯一解 (Unique)")
-
-# ==========================================
-# 分頁 2: 猜種族值
-# ==========================================
-with tab2:
+        move_reveal_panel(q, move_cache)
+
+@st.fragment
+def stat_reveal_panel(sq):
+    """種族值題的作答 / 看答案區"""
+    if st.button("👁️ 看答案 ", key="stat_ans", use_container_width=True):
+        reveal_answer(sq, 'stat_show_answer')
+
+    if is_admin:
+        st.caption(f"答案是 **{sq['answer_name']}**")
+    elif not st.session_state.get('stat_show_answer', False):
+        render_guess_box(sq, "stat_guess")
+
+    if st.session_state.get('stat_show_answer', False):
+        st.divider()
+        st.success(f"### 答案：{sq['answer_name']} ({sq['answer_jp']})")
+        st.caption(f"英文: {sq['answer_en']} | ID: #{sq['answer_id']}")
+        st.write(f"📊 **來源紀錄**: `{sq['source']}` (Rank: #{sq['rank']})")
+        img_url = get_reveal_data(sq)['img_url']
+        if img_url: st.image(img_url, width=200)
+        st.balloons()
+
+@st.fragment
+def stat_panel(vgc_db):
+    """種族值題：出題 / 同步按鈕與題目"""
     stat_cache = load_stat_cache()
     if not stat_cache:
         st.warning("⚠️ 找不到 Cache 4")
+        return
+
+    # 狀態同步邏輯
+    if 'current_stat_q' not in st.session_state:
+        synced_q = sync_question("stat", vgc_db, stat_cache)
+        if synced_q:
+             st.session_state.current_stat_q = synced_q
+        elif is_admin:
+             st.session_state.current_stat_q = host_next_question("stat", vgc_db, stat_cache)
+
+    if is_admin:
+        if st.button("🔄 下一題", key="stat_next", use_container_width=True, type="primary"):
+            st.session_state.current_stat_q = host_next_question("stat", vgc_db, stat_cache)
+            if st.session_state.current_stat_q is None: st.warning("出題失敗，請再按一次")
     else:
-        # 狀態同步邏輯
-        if 'current_stat_q' not in st.session_state:
-            if server.current_q_stat:
-                 st.session_state.current_stat_q = server.current_q_stat
-            elif is_admin:
-                 st.session_state.current_stat_q = generate_stat_question(vgc_db, stat_cache, is_admin=True)
-
         scol1, scol2 = st.columns([1, 1])
         with scol1:
-            if is_admin:
-                if st.button("🔄 下一題", key="stat_next", use_container_width=True, type="primary"):
-                    q = generate_stat_question(vgc_db, stat_cache, is_admin=True)
-                    st.session_state.current_stat_q = q
-                    st.rerun()
-            else:
-                if st.button("🎲 下一題 (自己玩)", key="stat_next_self", use_container_width=True):
-                    q = generate_stat_question(vgc_db, stat_cache, is_admin=False)
-                    st.session_state.current_stat_q = q
-                    st.session_s
-                if st.button("📥 同步題目", key="stat_sync", use_container_width=True):
-                    if server.current_q_stat:
-                        st.session_state.current_stat_q = server.current_q_stat
-                        st.session_state.stat_show_answer = False
-                        st.success("已同步！")
-                        time.sleep(0.5)
-                        st.rerun()
-                    else:
-                        st.warning("裁判還沒出題！")
+            if st.button("🎲 下一題 (自己玩)", key="stat_next_self", use_container_width=True):
+                st.session_state.current_stat_q = self_play_question("stat", vgc_db, stat_cache)
+                st.session_state.stat_show_answer = False
         with scol2:
-            if st.button("👁️ 看答案 ", key="stat_ans", use_container_width=True):
-                st.session_state.stat_show_answer = True
-                st.rerun()
-
-        sq = st.session_state.get('current_stat_q')
-        if sq:
-            st.subheader("請根據種族值猜寶可夢：")
-            stats = sq['stats']
-            row1 = st.columns(3)
-            row1[0].metric("HP", stats.get('hp', 0))
-            row1[1].metric("Attack", stats.get('atk', 0))
-            row1[2].metric("Defense", stats.get('def', 0))
-            row2 = st.columns(3)
-            row2[0].metric("Sp. Atk", stats.get('spa', 0))
-            row2[1].metric("Sp. Def", stats.get('spd', 0))
-            row2[2].metric("Speed", stats.get('spe', 0))
-            st.caption(f"種族值總和 (BST): {sum(stats.values())}")
-
-            if is_admin:
-                st.caption(f"答案是 **{sq['answer_name']}**")
-
-            if st.session_state.get('stat_show_answer', False):
-                st.divider()
-                st.success(f"### 答案：{sq['answer_name']} ({sq['answer_jp']})")
-                st.caption(f"英文: {sq['answer_en']} | ID: #{sq['answer_id']}")
-                st.write(f"📊 **來源紀錄**: `{sq['source']}` (Rank: #{sq['rank']})")
-                img_url = f"https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/{sq['answer_id']}.png"
-                st.image(img_url, width=200)
-                st.balloons()
\ No newline at end of file
+            if st.button("📥 同步題目", key="stat_sync", use_container_width=True):
+                synced_q = sync_question("stat", vgc_db, stat_cache)
+                if synced_q:
+                    st.session_state.current_stat_q = synced_q
+                    st.session_state.stat_show_answer = False
+                    st.toast("已同步！")
+                else:
+                    st.warning("裁判還沒出題！")
+
+    sq = st.session_state.get('current_stat_q')
+    if sq:
+        st.subheader("請根據種族值猜寶可夢：")
+        stats = sq['stats']
+        row1 = st.columns(3)
+        row1[0].metric("HP", stats.get('hp', 0))
+        row1[1].metric("Attack", stats.get('atk', 0))
+        row1[2].metric("Defense", stats.get('def', 0))
+        row2 = st.columns(3)
+        row2[0].metric("Sp. Atk", stats.get('spa', 0))
+        row2[1].metric("Sp. Def", stats.get('spd', 0))
+        row2[2].metric("Speed", stats.get('spe', 0))
+        st.caption(f"種族值總和 (BST): {sum(stats.values())}")
+        stat_reveal_panel(sq)
+
+def main():
+    """streamlit 每次 rerun 執行的整頁畫面"""
+    global is_admin, player_name
+    start_warm_up()
+    if not server.ready:
+        st.info(f"⏳ 伺服器暖機中，請稍候… ({server.warmup_stage or 'starting'})")
+        time.sleep(0.5)
+        st.rerun()
+
+    vgc_db = load_vgc_data()
+    if not vgc_db:
+        st.error("❌ 找不到 VGC JSON 資料。")
+        st.stop()
+
+    # --- 側邊欄：權限設定 ---
+    st.sidebar.title("Setting")
+    is_admin = st.sidebar.toggle("Host", value=False)
+
+    admin_input = st.sidebar.text_input("password", type="password")
+    is_admin = False
+    if admin_input == ADMIN_PASSWORD:
+        is_admin = True
+        st.sidebar.success("你負責出題，並可以看到答案")
+    else:
+        if admin_input: # 如果有輸入但錯誤
+            st.sidebar.error("❌ 密碼錯誤")
+        else:
+            st.sidebar.info("👤 目前身分：選手")
+
+    # --- 側邊欄：種子模式 (裁判) ---
+    if is_admin:
+        seed_mode = st.sidebar.toggle("🌱 種子模式", value=server.seed is not None)
+        if seed_mode and server.seed is None:
+            server.seed_round_move = server.seed_round_stat = 0
+            server.seed = random.randint(SEED_MIN, SEED_MAX)
+        elif not seed_mode and server.seed is not None:
+            server.seed = None
+        if server.seed is not None:
+            st.sidebar.caption(f"種子 `{server.seed}` | 資料版本 `{load_snapshot_version()}`")
+        with st.sidebar.expander("⏱️ 暖機耗時"):
+            for stage, seconds in server.warmup_timings.items():
+                st.write(f"`{stage}`: {seconds * 1000:.1f} ms")
+            if server.warmup_error: st.error(server.warmup_error)
+
+    player_name = "" if is_admin else st.sidebar.text_input("暱稱 (計分用)", max_chars=20).strip()
+
+    with st.sidebar:
+        leaderboard_panel()
+
+    tab1, tab2 = st.tabs(["move guess", "base stats guess"])
+
+    # ==========================================
+    # 分頁 1: 猜配招
+    # ==========================================
+    with tab1:
+        move_panel(vgc_db)
+
+    # ==========================================
+    # 分頁 2: 猜種族值
+    # ==========================================
+    with tab2:
+        stat_panel(vgc_db)
+
+# ==========================================
+# 進入點
+# ==========================================
+
+# streamlit run 才畫畫面；被 import (例如測試) 時只載入函式
+if st.runtime.exists():
+    main()
+elif __name__ == "__main__":
+    # python web_game_4.py：不開網頁，只跑本機暖機階段並印出耗時 (部署後的健康檢查用，不連 PokeAPI、不開計分板)
+    for stage, seconds in warm_up(health_check=True).items():
+        print(f"{stage:<22}{seconds * 1000:9.1f} ms")
+    if server.warmup_error: print(f"warm-up failed at {server.warmup_error}")
+    sys.exit(1 if server.warmup_error else 0)